@@ -0,0 +1,68 @@
+"""
+JSON для прокси к API: orjson, если установлен, иначе стандартный json.
+AUTODOC_JSON_CODEC = 'json' принудительно включает стандартную библиотеку.
+"""
+import json
+
+from django.conf import settings
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKEND = 'orjson' if orjson is not None and settings.AUTODOC_JSON_CODEC != 'json' else 'json'
+
+
+def loads(data):
+    if BACKEND == 'orjson':
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(data, sort_keys=False):
+    """Всегда возвращает bytes (UTF-8)."""
+    if BACKEND == 'orjson':
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        return orjson.dumps(data, default=str, option=option)
+    return json.dumps(data, sort_keys=sort_keys, ensure_ascii=False, default=str).encode('utf-8')
+
+
+def json_response(data, status=200):
+    return HttpResponse(dumps(data), status=status, content_type='application/json')
+
+
+EMPTY_BODIES = (b'', b'{}', b'[]', b'null')
+
+
+def is_empty(upstream):
+    return upstream.content.strip() in EMPTY_BODIES
+
+
+def is_json(upstream):
+    return upstream.headers.get('Content-Type', '').startswith('application/json')
+
+
+def relay_response(upstream, status=None):
+    """Отдаём тело ответа API как есть, без разбора и повторной сериализации."""
+    return HttpResponse(
+        upstream.content,
+        status=status or upstream.status_code,
+        content_type=upstream.headers.get('Content-Type', 'application/json'),
+    )
+
+
+def wrap_response(upstream, **fields):
+    """
+    {**fields, 'data': <тело ответа API>} без разбора тела.
+    Если API вернул не JSON - разбираем как раньше, чтобы ошибка была та же.
+    """
+    if not is_json(upstream) or not upstream.content.strip():
+        return json_response({**fields, 'data': loads(upstream.content)})
+    head = dumps(fields)[:-1]
+    separator = b',' if fields else b''
+    return HttpResponse(
+        head + separator + b'"data":' + upstream.content + b'}',
+        content_type='application/json',
+    )
@@ -0,0 +1,129 @@
+"""
+Логирование без блокировок на пути запроса.
+
+Записи кладутся в очередь, а форматирование и вывод выполняет отдельный поток.
+Подключается через LOGGING в settings.py.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+PAYLOAD_LIMIT = 1000
+
+
+class Truncated:
+    """
+    Обёртка для больших значений (тела запросов и ответов API).
+    Обрезается только при форматировании, то есть уже в потоке логирования.
+    """
+
+    def __init__(self, value, limit=PAYLOAD_LIMIT):
+        self.value = value
+        self.limit = limit
+
+    def __str__(self):
+        if isinstance(self.value, bytes):
+            # Тело ответа декодируем тоже здесь, а не в потоке запроса
+            text = self.value.decode('utf-8', errors='replace')
+        elif isinstance(self.value, str):
+            text = self.value
+        else:
+            text = repr(self.value)
+        if len(text) > self.limit:
+            return f"{text[:self.limit]}... [+{len(text) - self.limit} chars]"
+        return text
+
+    __repr__ = __str__
+
+
+class PayloadFilter(logging.Filter):
+    """
+    Семплирование INFO/DEBUG по endpoint (extra={'endpoint': ...}) и обрезка Truncated.
+    WARNING и выше проходят всегда и без обрезки.
+    """
+
+    def __init__(self, rates=None):
+        super().__init__()
+        self.rates = rates or {}
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            if isinstance(record.args, tuple):
+                record.args = tuple(
+                    arg.value if isinstance(arg, Truncated) else arg for arg in record.args
+                )
+            return True
+        rate = self.rates.get(getattr(record, 'endpoint', None), 1.0)
+        return rate >= 1.0 or random.random() < rate
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        data = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'pid': record.process,
+        }
+        endpoint = getattr(record, 'endpoint', None)
+        if endpoint:
+            data['endpoint'] = endpoint
+        if record.exc_text:
+            data['exc'] = record.exc_text
+        elif record.exc_info:
+            data['exc'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class AsyncStreamHandler(QueueHandler):
+    """
+    QueueHandler со своим QueueListener, который пишет в stderr.
+    Поток слушателя перезапускается после fork (gunicorn --preload).
+    """
+
+    def __init__(self):
+        super().__init__(queue.SimpleQueue())
+        self.target = logging.StreamHandler()
+        self._pid = None
+        self.listener = None
+        self._start_lock = threading.Lock()
+        # Блокировка могла быть занята другим потоком в момент fork
+        os.register_at_fork(after_in_child=self._reset_start_lock)
+
+    def _reset_start_lock(self):
+        self._start_lock = threading.Lock()
+
+    def setFormatter(self, fmt):
+        # Форматирует поток слушателя, а не вызывающий поток
+        self.target.setFormatter(fmt)
+
+    def _ensure_listener(self):
+        if self._pid == os.getpid():
+            return
+        # gthread: первыми в новом воркере могут залогировать сразу несколько потоков
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self.queue = queue.SimpleQueue()
+            self.listener = QueueListener(self.queue, self.target)
+            self.listener.start()
+            atexit.register(self.listener.stop)
+            self._pid = os.getpid()
+
+    def prepare(self, record):
+        # Сообщение собирается в потоке слушателя, здесь только трейсбек,
+        # пока исключение ещё живо
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        return record
+
+    def emit(self, record):
+        self._ensure_listener()
+        super().emit(record)
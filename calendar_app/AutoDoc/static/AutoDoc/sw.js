@@ -0,0 +1,324 @@
+// Service worker AutoDoc для планшетов в цехе.
+// - оболочка приложения и CDN-ресурсы кэшируются заранее;
+// - календарь: stale-while-revalidate, последний загруженный календарь -
+//   оболочка, которую показываем без сети;
+// - страницы дня/недели и get-assignment: сначала сеть (по ним работают
+//   и сохраняют статусы, устаревшие данные опасны), кэш - только без сети;
+// - сохранение статусов работ без сети ставится в очередь (IndexedDB)
+//   и отправляется, когда связь появится. Если сервер его отклонит,
+//   открытые страницы получают сообщение 'work-status-rejected'.
+// Отдаётся Django-вьюхой по адресу /sw.js, чтобы scope был весь сайт.
+
+const VERSION = 'autodoc-v3';
+const STATIC_CACHE = `${VERSION}-static`;
+const DATA_CACHE = `${VERSION}-data`;
+
+const SHELL_URL = '/calendar/';
+
+const PRECACHE_URLS = [
+    SHELL_URL,
+    'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css',
+    'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js',
+    'https://cdnjs.cloudflare.com/ajax/libs/jquery/3.6.0/jquery.min.js',
+    'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css',
+    'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css',
+    'https://fonts.googleapis.com/css2?family=Montserrat:wght@400;500;600;700&display=swap',
+];
+
+// Календарь можно показывать из кэша и обновлять в фоне
+const CALENDAR_PATH = /^\/calendar\/$/;
+const NETWORK_FIRST_PATHS = [
+    /^\/details\/\d+\/\d+\/\d+\/$/,
+    /^\/week\/\d+\/\d+\/\d+\/$/,
+    /^\/get-assignment\/\d+\/$/,
+];
+const WORK_STATUS_PATH = /^\/update-work-status\/\d+\/$/;
+
+const DB_NAME = 'autodoc-offline';
+const QUEUE_STORE = 'work-status-queue';
+const SYNC_TAG = 'replay-work-status';
+
+
+self.addEventListener('install', event => {
+    event.waitUntil(
+        caches.open(STATIC_CACHE).then(cache => Promise.allSettled(
+            // Один недоступный CDN не должен ломать установку.
+            // CDN отдают CORS-заголовки, поэтому ответы не opaque и cache.add их принимает
+            PRECACHE_URLS.map(url => cache.add(new Request(url, { mode: 'cors' })))
+        )).then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil(
+        caches.keys()
+            .then(keys => Promise.all(keys.filter(key => !key.startsWith(VERSION)).map(key => caches.delete(key))))
+            .then(() => self.clients.claim())
+            .then(replayQueue)
+    );
+});
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    const url = new URL(request.url);
+
+    if (url.origin !== self.location.origin) {
+        if (request.method === 'GET') {
+            event.respondWith(cacheFirst(request));
+        }
+        return;
+    }
+
+    if (request.method === 'POST' && WORK_STATUS_PATH.test(url.pathname)) {
+        event.respondWith(saveWorkStatus(request));
+        return;
+    }
+
+    if (request.method !== 'GET') {
+        // Любое изменение данных делает закэшированные страницы устаревшими. Кэш чистим
+        // до ответа, иначе location.reload() страницы может успеть взять старую версию
+        event.respondWith(fetch(request).then(async response => {
+            if (response.ok) {
+                await caches.delete(DATA_CACHE);
+            }
+            return response;
+        }));
+        return;
+    }
+
+    if (NETWORK_FIRST_PATHS.some(path => path.test(url.pathname))) {
+        event.respondWith(networkFirst(request));
+        return;
+    }
+
+    if (CALENDAR_PATH.test(url.pathname)) {
+        event.respondWith(staleWhileRevalidate(event, request));
+    }
+});
+
+self.addEventListener('sync', event => {
+    if (event.tag === SYNC_TAG) {
+        event.waitUntil(replayQueue());
+    }
+});
+
+self.addEventListener('message', event => {
+    if (event.data === 'replay') {
+        event.waitUntil(replayQueue());
+    }
+});
+
+
+async function cacheFirst(request) {
+    const cached = await caches.match(request);
+    if (cached) {
+        return cached;
+    }
+    const response = await fetch(request);
+    if (response.ok || response.type === 'opaque') {
+        const cache = await caches.open(STATIC_CACHE);
+        cache.put(request, response.clone());
+    }
+    return response;
+}
+
+function storeData(request, response) {
+    // Копии снимаем сразу: тело оригинала может уже читать страница
+    const copy = response.clone();
+    const puts = [caches.open(DATA_CACHE).then(cache => cache.put(request, copy))];
+    if (CALENDAR_PATH.test(new URL(request.url).pathname)) {
+        // Оболочка для офлайна - последний удачно загруженный календарь, а не версия с установки.
+        // Лежит в STATIC_CACHE, который не чистится при изменении данных
+        const shell = response.clone();
+        puts.push(caches.open(STATIC_CACHE).then(cache => cache.put(SHELL_URL, shell)));
+    }
+    return Promise.all(puts);
+}
+
+async function networkFirst(request) {
+    try {
+        const response = await fetch(request);
+        if (response.ok) {
+            await storeData(request, response);
+        }
+        return response;
+    } catch (error) {
+        const cached = await caches.match(request, { cacheName: DATA_CACHE });
+        if (cached) {
+            return cached;
+        }
+        throw error;
+    }
+}
+
+async function staleWhileRevalidate(event, request) {
+    const cached = await caches.match(request, { cacheName: DATA_CACHE });
+
+    const network = fetch(request).then(async response => {
+        if (response.ok) {
+            await storeData(request, response);
+        }
+        return response;
+    });
+
+    if (cached) {
+        event.waitUntil(network.catch(() => undefined));
+        return cached;
+    }
+    try {
+        return await network;
+    } catch (error) {
+        // Нет сети и нет этого месяца в кэше - хотя бы последний календарь
+        if (request.mode === 'navigate' && CALENDAR_PATH.test(new URL(request.url).pathname)) {
+            const shell = await caches.match(SHELL_URL, { cacheName: STATIC_CACHE });
+            if (shell) {
+                return shell;
+            }
+        }
+        throw error;
+    }
+}
+
+async function saveWorkStatus(request) {
+    const body = await request.clone().text();
+    // Идущий повтор очереди может как раз отправлять старое сохранение этого
+    // назначения - новое должно уйти после него, а не до
+    if (replayInFlight) {
+        await replayInFlight.catch(() => undefined);
+    }
+    try {
+        const response = await fetch(request);
+        if (response.ok) {
+            // Форма всегда отправляет статусы всех работ назначения,
+            // поэтому записи из очереди для него устарели
+            await dropQueued(request.url);
+            await caches.delete(DATA_CACHE);
+        }
+        return response;
+    } catch (error) {
+        await dropQueued(request.url);
+        await enqueue({ url: request.url, body, createdAt: Date.now() });
+        if (self.registration.sync) {
+            await self.registration.sync.register(SYNC_TAG).catch(() => undefined);
+        }
+        return new Response(JSON.stringify({ success: true, queued: true }), {
+            status: 202,
+            headers: { 'Content-Type': 'application/json' },
+        });
+    }
+}
+
+// sync, сообщение 'online' и activate могут прийти одновременно -
+// второй вызов ждёт уже идущую отправку, а не шлёт те же записи ещё раз
+let replayInFlight = null;
+
+function replayQueue() {
+    if (!replayInFlight) {
+        replayInFlight = sendQueued().finally(() => {
+            replayInFlight = null;
+        });
+    }
+    return replayInFlight;
+}
+
+function isRetryable(response) {
+    return response.status >= 500 || response.status === 408 || response.status === 429;
+}
+
+async function sendQueued() {
+    const entries = await readQueue();
+    let sent = 0;
+    try {
+        for (const entry of entries) {
+            let response;
+            try {
+                response = await fetch(entry.url, {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: entry.body,
+                });
+            } catch (error) {
+                // Сети всё ещё нет - попробуем при следующем sync/online
+                return;
+            }
+            // Сервер или API недоступны (502/503) - оставляем в очереди
+            if (isRetryable(response)) {
+                return;
+            }
+            await dequeue(entry.id);
+            sent += 1;
+            if (!response.ok) {
+                // Отклонено окончательно - повтор не поможет, но пользователь должен знать
+                await notifyRejected(entry, response);
+            }
+        }
+    } finally {
+        if (sent) {
+            await caches.delete(DATA_CACHE);
+        }
+    }
+}
+
+async function notifyRejected(entry, response) {
+    const data = await response.json().catch(() => ({}));
+    const message = {
+        type: 'work-status-rejected',
+        assignmentId: new URL(entry.url).pathname.split('/')[2],
+        error: data.error || `HTTP ${response.status}`,
+    };
+    const windows = await self.clients.matchAll({ type: 'window' });
+    windows.forEach(client => client.postMessage(message));
+    if (!windows.length && self.Notification && Notification.permission === 'granted') {
+        await self.registration.showNotification('AutoDoc', {
+            body: `Статусы работ назначения #${message.assignmentId} не сохранены: ${message.error}`,
+        });
+    }
+}
+
+
+function openDb() {
+    return new Promise((resolve, reject) => {
+        const open = indexedDB.open(DB_NAME, 1);
+        open.onupgradeneeded = () => open.result.createObjectStore(QUEUE_STORE, { keyPath: 'id', autoIncrement: true });
+        open.onsuccess = () => resolve(open.result);
+        open.onerror = () => reject(open.error);
+    });
+}
+
+async function withStore(mode, callback) {
+    const db = await openDb();
+    return new Promise((resolve, reject) => {
+        const tx = db.transaction(QUEUE_STORE, mode);
+        const result = callback(tx.objectStore(QUEUE_STORE));
+        tx.oncomplete = () => resolve(result.result);
+        tx.onerror = () => reject(tx.error);
+    });
+}
+
+function enqueue(entry) {
+    return withStore('readwrite', store => store.add(entry));
+}
+
+function readQueue() {
+    return withStore('readonly', store => store.getAll());
+}
+
+function dequeue(id) {
+    return withStore('readwrite', store => store.delete(id));
+}
+
+function dropQueued(url) {
+    return withStore('readwrite', store => {
+        const cursor = store.openCursor();
+        cursor.onsuccess = () => {
+            if (!cursor.result) {
+                return;
+            }
+            if (cursor.result.value.url === url) {
+                cursor.result.delete();
+            }
+            cursor.result.continue();
+        };
+        return cursor;
+    });
+}
@@ -1,3 +1,369 @@
-from django.test import TestCase
+import json
+import logging
+import threading
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from . import jsoncodec, views
+from .log import AsyncStreamHandler, PayloadFilter, Truncated
+
+
+def upstream_response(status, body, content_type='application/json'):
+    response = requests.Response()
+    response.status_code = status
+    response._content = body
+    response.headers['Content-Type'] = content_type
+    return response
+
+
+class SingleFlightTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_identical_reads_share_one_upstream_call(self):
+        calls = []
+        release = threading.Event()
+
+        def slow_fetch(endpoint, params=None):
+            calls.append(endpoint)
+            release.wait(5)
+            return [{'id': 1}]
+
+        results = []
+        before = views.get_single_flight_stats()
+        with mock.patch.object(views, '_fetch_api_data', slow_fetch):
+            threads = [
+                threading.Thread(target=lambda: results.append(views.get_api_data('work-assignments', {'day': 1})))
+                for _ in range(5)
+            ]
+            for thread in threads:
+                thread.start()
+            # Ждём, пока все пятеро встанут в очередь за лидером
+            while views.get_single_flight_stats()['collapsed'] - before['collapsed'] < 4:
+                threading.Event().wait(0.01)
+            release.set()
+            for thread in threads:
+                thread.join()
+
+        after = views.get_single_flight_stats()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [[{'id': 1}]] * 5)
+        self.assertEqual(after['upstream'] - before['upstream'], 1)
+        self.assertEqual(after['collapsed'] - before['collapsed'], 4)
+        self.assertEqual(views._inflight, {})
+
+    def test_upstream_failure_returns_empty_result(self):
+        session = mock.Mock()
+        session.get.side_effect = requests.ConnectionError('down')
+        with mock.patch.object(views, 'api_session', lambda: session):
+            self.assertEqual(views.get_api_data('cars'), [])
+        self.assertEqual(views._inflight, {})
+
+    def test_non_json_upstream_returns_empty_result(self):
+        session = mock.Mock()
+        session.get.return_value = upstream_response(200, b'<html></html>', 'text/html')
+        with mock.patch.object(views, 'api_session', lambda: session):
+            self.assertEqual(views.get_api_data('cars'), [])
+
+    def test_leader_error_is_raised_in_followers(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def failing_fetch(endpoint, params=None):
+            started.set()
+            release.wait(5)
+            raise RuntimeError('boom')
+
+        errors = []
+
+        def call():
+            try:
+                views.get_api_data('cars')
+            except RuntimeError as e:
+                errors.append(str(e))
+
+        before = views.get_single_flight_stats()
+        with mock.patch.object(views, '_fetch_api_data', failing_fetch):
+            leader = threading.Thread(target=call)
+            leader.start()
+            started.wait(5)
+            follower = threading.Thread(target=call)
+            follower.start()
+            while views.get_single_flight_stats()['collapsed'] == before['collapsed']:
+                threading.Event().wait(0.01)
+            release.set()
+            leader.join()
+            follower.join()
+
+        self.assertEqual(errors, ['boom', 'boom'])
+        self.assertEqual(views._inflight, {})
+
+    @override_settings(AUTODOC_SHARED_SINGLE_FLIGHT=True)
+    def test_shared_result_is_not_reused_after_write(self):
+        responses = iter([['before'], ['after']])
+        with mock.patch.object(views, '_fetch_api_data', lambda endpoint, params=None: next(responses)):
+            self.assertEqual(views.get_api_data('work-assignments'), ['before'])
+            views.bump_data_generation()
+            self.assertEqual(views.get_api_data('work-assignments'), ['after'])
+
+    def test_read_after_write_does_not_join_older_flight(self):
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def slow_fetch(endpoint, params=None):
+            calls.append(endpoint)
+            if len(calls) == 1:
+                started.set()
+                release.wait(5)
+                return ['before']
+            return ['after']
+
+        results = []
+        with mock.patch.object(views, '_fetch_api_data', slow_fetch):
+            leader = threading.Thread(target=lambda: results.append(views.get_api_data('work-assignments')))
+            leader.start()
+            started.wait(5)
+            views.bump_data_generation()
+            self.assertEqual(views.get_api_data('work-assignments'), ['after'])
+            release.set()
+            leader.join()
+
+        self.assertEqual(results, [['before']])
+        self.assertEqual(len(calls), 2)
+
+    @override_settings(AUTODOC_SHARED_SINGLE_FLIGHT=True, AUTODOC_SINGLE_FLIGHT_LOG_EVERY=2)
+    def test_stats_are_logged_only_when_upstream_crosses_threshold(self):
+        with mock.patch.object(views, '_fetch_api_data', lambda endpoint, params=None: ['data']), \
+                mock.patch.object(views, '_single_flight_stats', {'upstream': 0, 'collapsed': 0, 'shared': 0}), \
+                mock.patch.object(views.logger, 'info') as log_info:
+            views.get_api_data('cars')
+            # Повторные запросы берут общий результат и upstream не увеличивают
+            for _ in range(3):
+                views.get_api_data('cars')
+            self.assertEqual(log_info.call_count, 0)
+            views.get_api_data('colors')
+            self.assertEqual(log_info.call_count, 1)
+
+
+@override_settings(AUTODOC_SHARED_CACHE=True)
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        views._refs_cache.clear()
+        self.status = False
+        self.calls = 0
+
+    def fake_api(self, endpoint, params=None):
+        self.calls += 1
+        if endpoint == 'work-assignments':
+            return [{'id': 1, 'date': '2026-10-19T10:00:00', 'person': {'full_name': 'Иван'}}]
+        if endpoint.startswith('work-assignment-works'):
+            return [{'executor_id': 1, 'work_id': 1, 'status': self.status}]
+        return [{'id': 1, 'full_name': 'Иван', 'name': 'Мойка'}]
+
+    def fake_post(self, endpoint, data):
+        self.status = True
+        return {'success': True}
+
+    def test_not_modified_without_api_call_until_write(self):
+        url = '/details/2026/10/19/'
+        with mock.patch.object(views, 'get_api_data', self.fake_api), \
+                mock.patch.object(views, 'post_api_data', self.fake_post):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            etag = response['ETag']
+
+            calls = self.calls
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(self.calls, calls)
+
+            response = self.client.post(
+                '/update-work-status/1/',
+                data=json.dumps({'updates': [{'work_id': 1, 'status': True}]}),
+                content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 200)
+
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response['ETag'], etag)
+
+    def test_write_during_read_does_not_pin_old_version(self):
+        url = '/details/2026/10/19/'
+        with mock.patch.object(views, 'get_api_data', self.fake_api):
+            etag = self.client.get(url)['ETag']
+            cache.clear()
+
+            def fetch_with_concurrent_write(endpoint, params=None):
+                # Изменение приходит, пока запрос дня ещё читает работы
+                if endpoint.startswith('work-assignment-works') and not self.status:
+                    self.status = True
+                    views.bump_data_generation()
+                    return [{'executor_id': 1, 'work_id': 1, 'status': False}]
+                return self.fake_api(endpoint, params)
+
+            with mock.patch.object(views, 'get_api_data', fetch_with_concurrent_write):
+                # Этот запрос прочитал данные до изменения - его 304 честный
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response['ETag'], etag)
+
+
+class AssignmentRangeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        views._refs_cache.clear()
+        self.months = []
+
+    def fake_api(self, endpoint, params=None):
+        if endpoint == 'work-assignments':
+            self.months.append((params['year'], params['month']))
+            return [
+                {'id': params['month'] * 100 + day, 'date': f"{params['year']}-{params['month']:02d}-{day:02d}T09:00:00",
+                 'person': {'full_name': name}}
+                for day, name in [(1, 'Пётр'), (11, 'Иван'), (12, 'Иван'), (18, 'Пётр'), (19, 'Иван')]
+            ]
+        if endpoint.startswith('work-assignment-works'):
+            return [{'executor_id': 1, 'work_id': 1, 'status': True}, {'executor_id': 1, 'work_id': 2, 'status': False}]
+        return [{'id': 1, 'full_name': 'Иван', 'name': 'Мойка'}]
+
+    def test_week_inside_month_is_one_upstream_call(self):
+        with mock.patch.object(views, 'get_api_data', self.fake_api):
+            response = self.client.get('/week/2026/10/12/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.months, [(2026, 10)])
+
+        columns = response.context['columns']
+        self.assertEqual([c['date'].day for c in columns], list(range(12, 19)))
+        rows = {row['person_name']: row['cells'] for row in response.context['rows']}
+        # 11 и 19 октября вне диапазона
+        self.assertEqual(sorted(rows), ['Иван', 'Пётр'])
+        self.assertEqual([[a['id'] for a in cell['assignments']] for cell in rows['Иван']],
+                         [[1012], [], [], [], [], [], []])
+        self.assertEqual([[a['id'] for a in cell['assignments']] for cell in rows['Пётр']],
+                         [[], [], [], [], [], [], [1018]])
+        self.assertEqual(rows['Иван'][0]['date'], columns[0]['date'])
+        self.assertEqual((rows['Иван'][0]['assignments'][0]['works_done'],
+                          rows['Иван'][0]['assignments'][0]['works_total']), (1, 2))
+
+    def test_range_across_month_boundary_is_one_call_per_month(self):
+        with mock.patch.object(views, 'get_api_data', self.fake_api):
+            response = self.client.get('/week/2026/10/30/?days=3')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.months, [(2026, 10), (2026, 11)])
+        rows = response.context['rows']
+        self.assertEqual([row['person_name'] for row in rows], ['Пётр'])
+        self.assertEqual([[a['id'] for a in cell['assignments']] for cell in rows[0]['cells']],
+                         [[], [], [1101]])
+
+    def test_invalid_days_is_bad_request(self):
+        response = self.client.get('/week/2026/10/19/?days=abc')
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_date_is_not_found(self):
+        response = self.client.get('/week/2026/2/30/')
+        self.assertEqual(response.status_code, 404)
+
+
+class UpdateWorkStatusTests(TestCase):
+    def post(self, session):
+        with mock.patch.object(views, 'api_session', lambda: session):
+            return self.client.post(
+                '/update-work-status/1/',
+                data=json.dumps({'updates': [{'work_id': 1, 'status': True}]}),
+                content_type='application/json'
+            )
+
+    def test_unreachable_api_is_bad_gateway(self):
+        session = mock.Mock()
+        session.post.side_effect = requests.ConnectionError('down')
+        self.assertEqual(self.post(session).status_code, 502)
+
+        session.post.side_effect = None
+        session.post.return_value = upstream_response(503, b'')
+        self.assertEqual(self.post(session).status_code, 502)
+
+    def test_rejected_update_is_bad_request(self):
+        session = mock.Mock()
+        session.post.return_value = upstream_response(422, b'{"detail": "unknown work"}')
+        self.assertEqual(self.post(session).status_code, 400)
+
+    def test_accepted_update(self):
+        session = mock.Mock()
+        session.post.return_value = upstream_response(200, b'{"success": true}')
+        response = self.post(session)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'success': True})
+
+
+class WrapResponseTests(TestCase):
+    def test_upstream_body_is_spliced_without_reencoding(self):
+        body = '{"id": 5,  "vin": "Ж"}'.encode('utf-8')
+        response = jsoncodec.wrap_response(upstream_response(200, body), success=True)
+        # Тело ответа API вставлено байт в байт, включая пробелы
+        self.assertTrue(response.content.endswith(b'"data":' + body + b'}'))
+        self.assertEqual(json.loads(response.content), {'success': True, 'data': {'id': 5, 'vin': 'Ж'}})
+
+    def test_non_json_upstream_is_decoded(self):
+        response = jsoncodec.wrap_response(upstream_response(200, b'[1, 2]', 'text/plain'), success=True)
+        self.assertEqual(json.loads(response.content), {'success': True, 'data': [1, 2]})
+
+    def test_empty_upstream_body_raises(self):
+        with self.assertRaises(ValueError):
+            jsoncodec.wrap_response(upstream_response(200, b''), success=True)
+
+
+def log_record(level, msg, *args, endpoint=None):
+    record = logging.LogRecord('AutoDoc.views', level, __file__, 1, msg, args, None)
+    if endpoint:
+        record.endpoint = endpoint
+    return record
+
+
+class LoggingTests(TestCase):
+    def test_truncated_cuts_long_values(self):
+        self.assertEqual(str(Truncated('x' * 15, limit=10)), 'xxxxxxxxxx... [+5 chars]')
+        self.assertEqual(str(Truncated('short', limit=10)), 'short')
+
+    def test_truncated_decodes_bytes_when_formatted(self):
+        self.assertEqual(str(Truncated('Ж'.encode('utf-8'))), 'Ж')
+        self.assertEqual(str(Truncated(b'\xff')), '\ufffd')
+
+    def test_info_is_sampled_per_endpoint(self):
+        payload_filter = PayloadFilter(rates={'create_assignment': 0.0, 'update_assignment': 0.5})
+        self.assertFalse(payload_filter.filter(log_record(logging.INFO, 'x', endpoint='create_assignment')))
+        self.assertTrue(payload_filter.filter(log_record(logging.INFO, 'x', endpoint='get_assignment')))
+        self.assertTrue(payload_filter.filter(log_record(logging.INFO, 'x')))
+        with mock.patch('AutoDoc.log.random.random', return_value=0.4):
+            self.assertTrue(payload_filter.filter(log_record(logging.INFO, 'x', endpoint='update_assignment')))
+        with mock.patch('AutoDoc.log.random.random', return_value=0.6):
+            self.assertFalse(payload_filter.filter(log_record(logging.INFO, 'x', endpoint='update_assignment')))
+
+    def test_warnings_are_never_sampled_or_truncated(self):
+        payload_filter = PayloadFilter(rates={'create_assignment': 0.0})
+        record = log_record(logging.ERROR, '%s', Truncated('y' * 50, limit=10), endpoint='create_assignment')
+        self.assertTrue(payload_filter.filter(record))
+        self.assertEqual(record.getMessage(), 'y' * 50)
+
+    def test_listener_is_started_once_per_process(self):
+        handler = AsyncStreamHandler()
+        start = threading.Barrier(8)
+
+        def first_log():
+            start.wait()
+            handler._ensure_listener()
+
+        with mock.patch('AutoDoc.log.QueueListener') as listener, mock.patch('AutoDoc.log.atexit.register'):
+            threads = [threading.Thread(target=first_log) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(listener.call_count, 1)
@@ -6,10 +6,12 @@ app_name = 'AutoDoc'
 urlpatterns = [
     path('calendar/', views.calendar_view, name='calendar'),
     path('details/<int:year>/<int:month>/<int:day>/', views.assignment_details_view, name='assignment_details'),
+    path('week/<int:year>/<int:month>/<int:day>/', views.assignment_range_view, name='assignment_range'),
     path('create-assignment/<int:year>/<int:month>/<int:day>/', views.create_assignment, name='create_assignment'),
     path('update-work-status/<int:assignment_id>/', views.update_work_status, name='update_work_status'),
     path('delete-assignment/<int:assignment_id>/', views.delete_assignment, name='delete_assignment'),
     #update card
     path('get-assignment/<int:assignment_id>/', views.get_assignment, name='get_assignment'),
     path('update-assignment/', views.update_assignment, name='update_assignment'),
+    path('sw.js', views.service_worker, name='service_worker'),
 ]
\ No newline at end of file
@@ -1,5 +1,9 @@
 from django.shortcuts import render, redirect
-from django.http import JsonResponse, HttpResponseServerError
+from django.http import Http404, HttpResponse, JsonResponse, HttpResponseServerError
+from django.contrib.staticfiles import finders
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
 from django.views.decorators.csrf import csrf_exempt
 import requests
 from datetime import datetime, timedelta, date
@@ -7,47 +11,305 @@ import calendar
 from django.urls import reverse
 import logging
 import json
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from itertools import groupby
 from operator import itemgetter
 
+from . import jsoncodec
+from .log import Truncated
+
 
 logger = logging.getLogger(__name__)
 API_BASE_URL = "https://apiautodoc-production.up.railway.app"
 # API_BASE_URL = "http://127.0.0.1:8080"
-
-def get_api_data(endpoint, params=None):
+# Сколько запросов к API один воркер может выполнять параллельно - на все
+# потоки gthread вместе: параллельные запросы идут через общий api_executor()
+API_CONCURRENCY = 8
+
+_session = None
+_session_pid = None
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def api_session():
+    """
+    Keep-alive сессия к API, своя в каждом процессе: после fork (gunicorn --preload)
+    соединения мастера использовать нельзя.
+    """
+    global _session, _session_pid
+    if _session_pid != os.getpid():
+        _session = requests.Session()
+        _session.headers['Accept-Encoding'] = 'gzip, deflate'
+        _session.headers['Accept'] = 'application/json'
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=API_CONCURRENCY)
+        _session.mount('http://', adapter)
+        _session.mount('https://', adapter)
+        _session_pid = os.getpid()
+    return _session
+
+
+def api_executor():
+    """
+    Один пул потоков на воркер для параллельных запросов к API. Размер совпадает
+    с пулом соединений api_session(), поэтому запросы не ждут свободного соединения
+    и не открывают лишние. Как и сессия, после fork создаётся заново.
+    """
+    global _executor, _executor_pid
+    if _executor_pid != os.getpid():
+        with _executor_lock:
+            if _executor_pid != os.getpid():
+                _executor = ThreadPoolExecutor(max_workers=API_CONCURRENCY, thread_name_prefix='autodoc-api')
+                _executor_pid = os.getpid()
+    return _executor
+
+
+def _fetch_api_data(endpoint, params=None):
     try:
-        response = requests.get(f"{API_BASE_URL}/{endpoint}", params=params, timeout=10)
+        response = api_session().get(f"{API_BASE_URL}/{endpoint}", params=params, timeout=10)
         response.raise_for_status()
-        return response.json()
-    except requests.RequestException as e:
-        logger.error(f"API error ({endpoint}): {e.response.text if e.response else str(e)}")
+        return jsoncodec.loads(response.content)
+    except (requests.RequestException, ValueError) as e:
+        # ValueError - API ответил не JSON
+        error_response = getattr(e, 'response', None)
+        logger.error("API error (%s): %s", endpoint, error_response.text if error_response is not None else e)
         return []
 
+
+# Одинаковые GET-запросы, которые выполняются одновременно, делят один вызов API
+_inflight = {}
+_inflight_lock = threading.Lock()
+_single_flight_stats = {'upstream': 0, 'collapsed': 0, 'shared': 0}
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = []
+        self.error = None
+
+
+def _count(name):
+    with _inflight_lock:
+        _single_flight_stats[name] += 1
+
+
+def _count_upstream():
+    """Считаем реальный запрос к API и раз в AUTODOC_SINGLE_FLIGHT_LOG_EVERY пишем счётчики в лог."""
+    with _inflight_lock:
+        _single_flight_stats['upstream'] += 1
+        stats = dict(_single_flight_stats)
+    if stats['upstream'] % settings.AUTODOC_SINGLE_FLIGHT_LOG_EVERY == 0:
+        logger.info("Single-flight stats: %s", stats)
+
+
+def get_single_flight_stats():
+    """
+    upstream - реальные запросы к API, collapsed - запросы, дождавшиеся
+    чужого запроса внутри воркера, shared - результаты, взятые у другого воркера.
+    """
+    with _inflight_lock:
+        return dict(_single_flight_stats)
+
+
+def get_api_data(endpoint, params=None):
+    # Поколение данных в ключе: запрос, начатый после изменения (bump_data_generation),
+    # не присоединится к запросу, начатому до него, и не получит старые данные
+    key = _digest([endpoint, params or {}, _data_generation()])
+
+    with _inflight_lock:
+        flight = _inflight.get(key)
+        leader = flight is None
+        if leader:
+            flight = _inflight[key] = _Flight()
+        else:
+            _single_flight_stats['collapsed'] += 1
+
+    if not leader:
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    try:
+        if settings.AUTODOC_SHARED_SINGLE_FLIGHT:
+            flight.result = _fetch_shared(key, endpoint, params)
+        else:
+            _count_upstream()
+            flight.result = _fetch_api_data(endpoint, params)
+        return flight.result
+    except Exception as e:
+        # Ожидающие запросы получают ту же ошибку, а не пустой результат
+        flight.error = e
+        raise
+    finally:
+        with _inflight_lock:
+            del _inflight[key]
+        flight.done.set()
+
+
+def _fetch_shared(key, endpoint, params):
+    """Single-flight между воркерами через блокировку в общем кэше (cache.add атомарен)."""
+    # key уже включает поколение данных, поэтому результат, полученный
+    # до изменения, другим воркерам после него не достанется
+    lock_key = f"autodoc:flight-lock:{key}"
+    result_key = f"autodoc:flight-result:{key}"
+
+    result = cache.get(result_key)
+    if result is not None:
+        _count('shared')
+        return result
+
+    if cache.add(lock_key, 1, timeout=settings.AUTODOC_SINGLE_FLIGHT_TIMEOUT):
+        try:
+            _count_upstream()
+            result = _fetch_api_data(endpoint, params)
+            cache.set(result_key, result, timeout=settings.AUTODOC_SINGLE_FLIGHT_RESULT_TTL)
+            return result
+        finally:
+            cache.delete(lock_key)
+
+    # Запрос уже выполняет другой воркер - ждём его результат
+    deadline = time.monotonic() + settings.AUTODOC_SINGLE_FLIGHT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        result = cache.get(result_key)
+        if result is not None:
+            _count('shared')
+            return result
+        if cache.get(lock_key) is None:
+            break
+
+    _count_upstream()
+    return _fetch_api_data(endpoint, params)
+
 def post_api_data(endpoint, data):
     try:
         data = {k: v.isoformat() if isinstance(v, datetime) else v for k, v in data.items()}
-        logger.info(f"Sending to {endpoint}: {data}")
-        response = requests.post(f"{API_BASE_URL}/{endpoint}", json=data, timeout=10)
+        logger.info("Sending to %s: %s", endpoint, Truncated(data), extra={'endpoint': 'post_api_data'})
+        response = api_session().post(
+            f"{API_BASE_URL}/{endpoint}",
+            data=jsoncodec.dumps(data),
+            headers={'Content-Type': 'application/json'},
+            timeout=10
+        )
+        if 400 <= response.status_code < 500:
+            # API отклонил данные - повторять бессмысленно, в отличие от None (API недоступен)
+            logger.error("API rejected (%s): %s", endpoint, Truncated(response.content))
+            return {}
         response.raise_for_status()
-        return response.json()
-    except requests.RequestException as e:
-        logger.error(f"API error ({endpoint}): {e.response.text if e.response else str(e)}")
+        return jsoncodec.loads(response.content)
+    except (requests.RequestException, ValueError) as e:
+        # ValueError - API ответил не JSON
+        error_response = getattr(e, 'response', None)
+        logger.error("API error (%s): %s", endpoint, error_response.text if error_response is not None else e)
         return None
 
 
 from functools import lru_cache
 
-@lru_cache(maxsize=1)
+REF_ENDPOINTS = ['cars', 'colors', 'works', 'persons', 'roles']
+
+
+_refs_cache = {}
+
+
 def get_cached_refs():
-    """Кэшируем справочники, чтобы не грузить каждый раз."""
-    return {
-        'cars': get_api_data("cars"),
-        'colors': get_api_data("colors"),
-        'works': get_api_data("works"),
-        'persons': get_api_data("persons"),
-        'roles': get_api_data("roles")
-    }
+    """
+    Кэшируем справочники, чтобы не грузить каждый раз. Грузим параллельно.
+    Неполные справочники (API недоступен) не запоминаем - попробуем в следующий раз.
+    """
+    if 'refs' in _refs_cache:
+        return _refs_cache['refs']
+    refs = dict(zip(REF_ENDPOINTS, api_executor().map(get_api_data, REF_ENDPOINTS)))
+    if all(refs.values()):
+        _refs_cache['refs'] = refs
+        _refs_cache['version'] = _digest(refs)
+    return refs
+
+
+def get_refs_version():
+    """Версия справочников - меняется только вместе с get_cached_refs."""
+    refs = get_cached_refs()
+    return _refs_cache.get('version') or _digest(refs)
+
+
+DATA_GENERATION_KEY = 'autodoc:data-generation'
+
+
+def _digest(data):
+    return hashlib.sha1(jsoncodec.dumps(data, sort_keys=True)).hexdigest()
+
+
+def _data_generation():
+    return cache.get(DATA_GENERATION_KEY, 0)
+
+
+def bump_data_generation():
+    """Сбрасываем закэшированные версии страниц после любого изменения данных."""
+    try:
+        cache.incr(DATA_GENERATION_KEY)
+    except ValueError:
+        cache.set(DATA_GENERATION_KEY, 1, timeout=None)
+
+
+def _version_cache_key(scope, generation):
+    return f"autodoc:version:{scope}:{generation}"
+
+
+def get_cached_version(scope, generation):
+    """
+    Версия страницы из кэша или None, если её нужно пересчитать по данным API.
+    generation - поколение данных, прочитанное в начале запроса.
+    Только с общим кэшем: в LocMemCache изменение в одном воркере не сбросит
+    версии в остальных, и они отвечали бы 304 со старой страницей.
+    """
+    if not settings.AUTODOC_SHARED_CACHE:
+        return None
+    return cache.get(_version_cache_key(scope, generation))
+
+
+def store_version(scope, generation, *parts, refs=True):
+    """
+    Считаем версию страницы по данным API и, если страница их показывает, версии справочников.
+    Сохраняем под поколением, прочитанным до запроса к API: если данные изменились,
+    пока запрос шёл, версия до изменения не попадёт под новое поколение.
+    Last-Modified сохраняется, пока не изменится сама версия.
+    """
+    etag = _digest([get_refs_version() if refs else None, *parts])
+    key = _version_cache_key(scope, generation)
+    version = cache.get(key)
+    if not version or version['etag'] != etag:
+        version = {'etag': etag, 'last_modified': int(time.time())}
+    cache.set(key, version, timeout=settings.AUTODOC_VERSION_TTL)
+    return version
+
+
+def not_modified_response(request, version):
+    """304, если клиент уже видел эту версию страницы, иначе None."""
+    if version is None:
+        return None
+    response = get_conditional_response(
+        request,
+        etag=quote_etag(version['etag']),
+        last_modified=version['last_modified'],
+    )
+    if response is not None:
+        set_version_headers(response, version)
+    return response
+
+
+def set_version_headers(response, version):
+    response['ETag'] = quote_etag(version['etag'])
+    response['Last-Modified'] = http_date(version['last_modified'])
+    # Планшеты всегда перепроверяют страницу, но получают 304 без тела
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 
 
@@ -57,8 +319,20 @@ def calendar_view(request):
         year = int(request.GET.get('year', current_date.year))
         month = int(request.GET.get('month', current_date.month))
 
+        # Подсветка текущего дня тоже часть страницы, поэтому дата входит в scope
+        scope = f"month:{year}-{month}:{current_date.date()}"
+        generation = _data_generation()
+        not_modified = not_modified_response(request, get_cached_version(scope, generation))
+        if not_modified:
+            return not_modified
+
         assignments = get_api_data("work-assignments", {'year': year, 'month': month})
-        logger.info(f"Assignments for {year}-{month}: {len(assignments)} records")
+        logger.info("Assignments for %s-%s: %s records", year, month, len(assignments))
+
+        version = store_version(scope, generation, assignments, refs=False)
+        not_modified = not_modified_response(request, version)
+        if not_modified:
+            return not_modified
 
         cal = calendar.monthcalendar(year, month)
         days_with_assignments = {
@@ -80,6 +354,10 @@ def calendar_view(request):
                 })
             calendar_data.append(week_data)
 
+        # Неделя для перехода в сетку: текущая, если открыт текущий месяц, иначе первая неделя месяца
+        week_anchor = current_date.date() if (year, month) == (current_date.year, current_date.month) else date(year, month, 1)
+        week_start = week_anchor - timedelta(days=week_anchor.weekday())
+
         prev_date = datetime(year, month, 1) - timedelta(days=1)
         next_date = datetime(year, month, 28) + timedelta(days=4)
 
@@ -93,13 +371,14 @@ def calendar_view(request):
             'next_year': next_date.year,
             'next_month': next_date.month,
             'current_day': current_date.day,
+            'week_start': week_start,
             'months': [(i, calendar.month_name[i]) for i in range(1, 13)],
             'years': list(range(year - 5, year + 6)),
         }
-        return render(request, 'AutoDoc/calendar.html', context)
+        return set_version_headers(render(request, 'AutoDoc/calendar.html', context), version)
 
     except Exception as e:
-        logger.error(f"Error in calendar_view: {e}")
+        logger.error("Error in calendar_view: %s", e, exc_info=True)
         return JsonResponse({'error': str(e)}, status=500)
 
 
@@ -117,74 +396,103 @@ def safe_set_locale():
                 locale.setlocale(locale.LC_TIME, 'Russian_Russia.1251')
             except locale.Error:
                 locale.setlocale(locale.LC_TIME, '')
-                if settings.DEBUG:
-                    print("Русская локаль не найдена, используется системная по умолчанию")
+                logger.debug("Русская локаль не найдена, используется системная по умолчанию")
 
 
     # Остальной код вашего view
 from collections import defaultdict
 
+
+def fetch_assignment_works(assignments):
+    """Работы всех назначений - параллельно, а не одним запросом за другим."""
+    if not assignments:
+        return {}
+    results = api_executor().map(
+        lambda a: get_api_data(f"work-assignment-works?work_assignment_id={a['id']}"),
+        assignments
+    )
+    return dict(zip((a['id'] for a in assignments), results))
+
+
+def group_assignments_by_person(assignments, works_by_assignment):
+    """Назначения с работами, сгруппированные по сотруднику и отсортированные по времени."""
+    if not assignments:
+        return []
+
+    persons = get_cached_refs()['persons']
+    works = get_cached_refs()['works']
+
+    # Сначала подготовим список назначений с работами и исполнителями, сгруппированными внутри каждого assignment
+    prepared_assignments = []
+    for assignment in assignments:
+        wa_works = works_by_assignment[assignment['id']]
+
+        # Группируем работы по исполнителям
+        works_by_executor = {}
+        for w in wa_works:
+            executor_id = w['executor_id']
+            if executor_id not in works_by_executor:
+                works_by_executor[executor_id] = {
+                    'employee_id': executor_id,
+                    'employee_name': next((p['full_name'] for p in persons if p['id'] == executor_id), 'Не назначен'),
+                    'works': []
+                }
+            works_by_executor[executor_id]['works'].append({
+                'work_id': w['work_id'],
+                'work_name': next((wrk['name'] for wrk in works if wrk['id'] == w['work_id']), 'Неизвестная работа'),
+                'status': w['status']
+            })
+
+        prepared_assignments.append({
+            'id': assignment['id'],
+            'time': datetime.fromisoformat(assignment['date']).strftime('%H:%M'),
+            'time_sort': datetime.fromisoformat(assignment['date']).time(),  # Добавляем поле для сортировки
+            'vin': assignment.get('vin', ''),
+            'car_number': assignment.get('car_number', ''),
+            'car_name': assignment['car']['name'] if assignment.get('car') else 'Не указано',
+            'color_name': assignment['color']['name'] if assignment.get('color') else 'Не указано',
+            'description': assignment.get('description', ''),
+            'works': list(works_by_executor.values()),
+            'works_total': len(wa_works),
+            'works_done': sum(1 for w in wa_works if w['status'])
+        })
+
+    # Теперь группируем по person_name
+    grouped = defaultdict(list)
+    for assign, original in zip(prepared_assignments, assignments):
+        # берем имя сотрудника из оригинального assignment (person.full_name)
+        person_name = original['person']['full_name'] if original.get('person') else 'Не указан'
+        grouped[person_name].append(assign)
+
+    # Сортируем назначения каждого сотрудника по времени
+    assignments_grouped = []
+    for person, assigns in grouped.items():
+        # Сортируем назначения по времени
+        sorted_assigns = sorted(assigns, key=lambda x: x['time_sort'])
+        assignments_grouped.append({
+            'person_name': person,
+            'assignments': sorted_assigns
+        })
+    return assignments_grouped
+
 def assignment_details_view(request, year, month, day):
     try:
-        safe_set_locale()
-        assignments = get_api_data("work-assignments", {'year': year, 'month': month, 'day': day})
+        scope = f"day:{year}-{month}-{day}"
+        generation = _data_generation()
+        not_modified = not_modified_response(request, get_cached_version(scope, generation))
+        if not_modified:
+            return not_modified
 
-        if assignments:
-            persons = get_cached_refs()['persons']
-            works = get_cached_refs()['works']
-
-            # Сначала подготовим список назначений с работами и исполнителями, сгруппированными внутри каждого assignment
-            prepared_assignments = []
-            for assignment in assignments:
-                wa_works = get_api_data(f"work-assignment-works?work_assignment_id={assignment['id']}")
-
-                # Группируем работы по исполнителям
-                works_by_executor = {}
-                for w in wa_works:
-                    executor_id = w['executor_id']
-                    if executor_id not in works_by_executor:
-                        works_by_executor[executor_id] = {
-                            'employee_id': executor_id,
-                            'employee_name': next((p['full_name'] for p in persons if p['id'] == executor_id), 'Не назначен'),
-                            'works': []
-                        }
-                    works_by_executor[executor_id]['works'].append({
-                        'work_id': w['work_id'],
-                        'work_name': next((wrk['name'] for wrk in works if wrk['id'] == w['work_id']), 'Неизвестная работа'),
-                        'status': w['status']
-                    })
-
-                prepared_assignments.append({
-                    'id': assignment['id'],
-                    'time': datetime.fromisoformat(assignment['date']).strftime('%H:%M'),
-                    'time_sort': datetime.fromisoformat(assignment['date']).time(),  # Добавляем поле для сортировки
-                    'vin': assignment.get('vin', ''),
-                    'car_number': assignment.get('car_number', ''),
-                    'car_name': assignment['car']['name'] if assignment.get('car') else 'Не указано',
-                    'color_name': assignment['color']['name'] if assignment.get('color') else 'Не указано',
-                    'description': assignment.get('description', ''),
-                    'works': list(works_by_executor.values())
-                })
+        assignments = get_api_data("work-assignments", {'year': year, 'month': month, 'day': day})
+        works_by_assignment = fetch_assignment_works(assignments)
 
-            # Теперь группируем по person_name
-            grouped = defaultdict(list)
-            for assign, original in zip(prepared_assignments, assignments):
-                # берем имя сотрудника из оригинального assignment (person.full_name)
-                person_name = original['person']['full_name'] if original.get('person') else 'Не указан'
-                grouped[person_name].append(assign)
-
-            # Сортируем назначения каждого сотрудника по времени
-            assignments_grouped = []
-            for person, assigns in grouped.items():
-                # Сортируем назначения по времени
-                sorted_assigns = sorted(assigns, key=lambda x: x['time_sort'])
-                assignments_grouped.append({
-                    'person_name': person,
-                    'assignments': sorted_assigns
-                })
+        version = store_version(scope, generation, assignments, works_by_assignment)
+        not_modified = not_modified_response(request, version)
+        if not_modified:
+            return not_modified
 
-        else:
-            assignments_grouped = []
+        safe_set_locale()
+        assignments_grouped = group_assignments_by_person(assignments, works_by_assignment)
 
         context = {
             'day': day,
@@ -196,28 +504,119 @@ def assignment_details_view(request, year, month, day):
             'hours': list(range(8, 20)),
             'minutes': list(range(0, 60, 5))
         }
-        return render(request, 'AutoDoc/assignment_details.html', context)
+        response = render(request, 'AutoDoc/assignment_details.html', context)
+        return set_version_headers(response, version)
 
     except Exception as e:
-        logger.error(f"Error in assignment_details_view: {e}")
+        logger.error("Error in assignment_details_view: %s", e, exc_info=True)
         return JsonResponse({'error': str(e)}, status=500)
 
 
 
 
 
+def assignment_range_view(request, year, month, day):
+    """Сетка сотрудник x день за несколько дней (по умолчанию неделя)."""
+    try:
+        days = min(max(int(request.GET.get('days', 7)), 1), 31)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid days value'}, status=400)
+    try:
+        start = date(year, month, day)
+    except ValueError:
+        raise Http404("Invalid date")
+
+    try:
+        dates = [start + timedelta(days=i) for i in range(days)]
+
+        scope = f"range:{start}:{days}:{date.today()}"
+        generation = _data_generation()
+        not_modified = not_modified_response(request, get_cached_version(scope, generation))
+        if not_modified:
+            return not_modified
+
+        # API фильтрует только по году/месяцу/дню, поэтому берём целые месяцы
+        # (один запрос, два - если диапазон захватывает соседний месяц)
+        assignments = [
+            a
+            for y, m in sorted({(d.year, d.month) for d in dates})
+            for a in get_api_data("work-assignments", {'year': y, 'month': m})
+            if a.get('date') and start <= datetime.fromisoformat(a['date']).date() <= dates[-1]
+        ]
+        works_by_assignment = fetch_assignment_works(assignments)
+
+        # Имена из справочников в сетке недели не выводятся
+        version = store_version(scope, generation, assignments, works_by_assignment, refs=False)
+        not_modified = not_modified_response(request, version)
+        if not_modified:
+            return not_modified
+
+        safe_set_locale()
+        by_date = defaultdict(list)
+        for a in assignments:
+            by_date[datetime.fromisoformat(a['date']).date()].append(a)
+
+        cells = {}
+        for d, day_assignments in by_date.items():
+            for group in group_assignments_by_person(day_assignments, works_by_assignment):
+                cells[(group['person_name'], d)] = group['assignments']
+
+        columns = [
+            {'date': d, 'weekday': calendar.day_abbr[d.weekday()], 'is_current': d == date.today()}
+            for d in dates
+        ]
+        rows = [
+            {
+                'person_name': person,
+                'cells': [{**column, 'assignments': cells.get((person, column['date']), [])} for column in columns]
+            }
+            for person in sorted({person for person, _ in cells})
+        ]
+
+        prev_start = start - timedelta(days=days)
+        next_start = start + timedelta(days=days)
+        context = {
+            'days': days,
+            'start': start,
+            'end': dates[-1],
+            'columns': columns,
+            'rows': rows,
+            'prev_start': prev_start,
+            'next_start': next_start,
+        }
+        response = render(request, 'AutoDoc/assignment_range.html', context)
+        return set_version_headers(response, version)
+
+    except Exception as e:
+        logger.error("Error in assignment_range_view: %s", e, exc_info=True)
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@lru_cache(maxsize=1)
+def _service_worker_source():
+    with open(finders.find('AutoDoc/sw.js'), 'rb') as f:
+        return f.read()
+
+
+def service_worker(request):
+    """sw.js из статики, но с корня сайта - иначе scope ограничится /static/."""
+    response = HttpResponse(_service_worker_source(), content_type='application/javascript')
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
 def get_assignment(request, assignment_id):
     try:
-        response = requests.get(
+        response = api_session().get(
             f"{API_BASE_URL}/get-assignment/{assignment_id}",  # Исправленный URL
             headers={"Content-Type": "application/json"}
         )
 
         if response.status_code == 200:
-            return JsonResponse(response.json())
+            return jsoncodec.relay_response(response)
         else:
             return JsonResponse(
-                {'error': f"API error: {response.json().get('detail', 'Unknown error')}"},
+                {'error': f"API error: {jsoncodec.loads(response.content).get('detail', 'Unknown error')}"},
                 status=response.status_code
             )
 
@@ -280,7 +679,7 @@ def update_assignment(request):
         return JsonResponse({'error': 'Method not allowed'}, status=405)
 
     try:
-        data = json.loads(request.body)
+        data = jsoncodec.loads(request.body)
         assignment_id = data.get('id')
 
         if not assignment_id:
@@ -307,18 +706,19 @@ def update_assignment(request):
                     'status': work.get('status', False)  # Сохраняем статус
                 })
 
-        print(f"Sending payload to API: {payload}")  # Отладочный вывод
+        logger.info("Sending payload to API: %s", Truncated(payload), extra={'endpoint': 'update_assignment'})
 
-        response = requests.put(
+        response = api_session().put(
             f"{API_BASE_URL}/work-assignments/{assignment_id}",
-            json=payload,
+            data=jsoncodec.dumps(payload),
             headers={"Content-Type": "application/json"}
         )
 
         if response.status_code == 200:
-            return JsonResponse({'success': True, 'data': response.json()})
+            bump_data_generation()
+            return jsoncodec.wrap_response(response, success=True)
         else:
-            error_detail = response.json().get('detail', 'Unknown error')
+            error_detail = jsoncodec.loads(response.content).get('detail', 'Unknown error')
             return JsonResponse(
                 {'error': f"API error: {error_detail}"},
                 status=response.status_code
@@ -329,21 +729,22 @@ def update_assignment(request):
 @csrf_exempt 
 def delete_assignment(request, assignment_id):
     try:
-        response = requests.delete(
+        response = api_session().delete(
             f"{API_BASE_URL}/work-assignments/{assignment_id}",
             headers={"Content-Type": "application/json"}
         )
 
         if response.status_code == 204:
+            bump_data_generation()
             return JsonResponse({'success': True})
         else:
             return JsonResponse(
-                {'error': f"API error: {response.json().get('detail', 'Unknown error')}"},
+                {'error': f"API error: {jsoncodec.loads(response.content).get('detail', 'Unknown error')}"},
                 status=response.status_code
             )
 
     except Exception as e:
-        logger.error(f"Error deleting assignment: {e}")
+        logger.error("Error deleting assignment: %s", e, exc_info=True)
         return JsonResponse({'error': str(e)}, status=500)
 #
 # @csrf_exempt
@@ -390,29 +791,29 @@ def create_assignment(request, year, month, day):
     if request.method == 'POST':
         try:
             # Логируем входящий запрос
-            logger.info(f"Incoming request headers: {request.headers}")
-            logger.info(f"Content type: {request.content_type}")
+            logger.debug("Incoming request headers: %s", Truncated(request.headers), extra={'endpoint': 'create_assignment'})
+            logger.debug("Content type: %s", request.content_type, extra={'endpoint': 'create_assignment'})
 
             # Парсим данные запроса
             try:
                 if request.content_type == 'application/json':
-                    data = json.loads(request.body)
+                    data = jsoncodec.loads(request.body)
                 else:
                     data = request.POST.dict()
                     data['work_ids'] = request.POST.getlist('work_ids[]')
                     data['work_employees'] = request.POST.getlist('work_employees[]')
             except Exception as e:
-                logger.error(f"Error parsing request data: {str(e)}")
+                logger.error("Error parsing request data: %s", e, extra={'endpoint': 'create_assignment'})
                 return JsonResponse({'error': 'Invalid request data format'}, status=400)
 
-            logger.info(f"Parsed request data: {data}")
+            logger.info("Parsed request data: %s", Truncated(data), extra={'endpoint': 'create_assignment'})
 
             # Валидация обязательных полей
             required_fields = ['person_id']
             for field in required_fields:
                 if field not in data or not data[field]:
                     error_msg = f"Missing required field: {field}"
-                    logger.error(error_msg)
+                    logger.error(error_msg, extra={'endpoint': 'create_assignment'})
                     return JsonResponse({'error': error_msg}, status=400)
 
             # Подготовка данных для API
@@ -438,7 +839,7 @@ def create_assignment(request, year, month, day):
                 try:
                     assignment_data['color_id'] = int(color_id)
                 except (ValueError, TypeError):
-                    logger.warning(f"Invalid color_id value: {color_id}")
+                    logger.warning("Invalid color_id value: %s", color_id, extra={'endpoint': 'create_assignment'})
                     # Удаляем поле если значение невалидное
                     assignment_data.pop('color_id', None)
             else:
@@ -454,55 +855,54 @@ def create_assignment(request, year, month, day):
                             'executor_id': int(work['executor_id']) if work.get('executor_id') else None
                         })
 
-            logger.info(f"Prepared API request data: {assignment_data}")
+            logger.info("Prepared API request data: %s", Truncated(assignment_data), extra={'endpoint': 'create_assignment'})
 
             # Отправка запроса к API
             try:
-                response = requests.post(
+                response = api_session().post(
                     f"{API_BASE_URL}/work-assignments",
-                    json=assignment_data,
+                    data=jsoncodec.dumps(assignment_data),
                     headers={'Content-Type': 'application/json'},
                     timeout=10
                 )
 
-                logger.info(f"API response status: {response.status_code}")
-                logger.info(f"API response content: {response.text}")
+                logger.info("API response %s: %s", response.status_code, Truncated(response.content), extra={'endpoint': 'create_assignment'})
 
                 # Обработка ответа
                 if response.status_code == 200:
-                    try:
-                        response_data = response.json()
-                        if not response_data:
-                            logger.warning("API returned empty response")
-                            return JsonResponse({
-                                'success': True,
-                                'redirect_url': reverse('AutoDoc:assignment_details',
-                                                        kwargs={'year': year, 'month': month, 'day': day})
-                            })
-                        return JsonResponse(response_data)
-                    except ValueError:
-                        logger.warning("API returned non-JSON response")
+                    bump_data_generation()
+                    # Пустоту и тип проверяем по байтам и заголовку, тело не разбираем
+                    if jsoncodec.is_empty(response):
+                        logger.warning("API returned empty response", extra={'endpoint': 'create_assignment'})
+                        return JsonResponse({
+                            'success': True,
+                            'redirect_url': reverse('AutoDoc:assignment_details',
+                                                    kwargs={'year': year, 'month': month, 'day': day})
+                        })
+                    if not jsoncodec.is_json(response):
+                        logger.warning("API returned non-JSON response", extra={'endpoint': 'create_assignment'})
                         return JsonResponse({
                             'success': True,
                             'redirect_url': reverse('AutoDoc:assignment_details',
                                                     kwargs={'year': year, 'month': month, 'day': day})
                         })
+                    return jsoncodec.relay_response(response)
                 else:
                     error_msg = f"API returned status {response.status_code}"
                     try:
-                        error_detail = response.json().get('detail', response.text)
+                        error_detail = jsoncodec.loads(response.content).get('detail', response.text)
                         error_msg += f": {error_detail}"
                     except ValueError:
                         error_msg += f": {response.text}"
-                    logger.error(error_msg)
+                    logger.error(error_msg, extra={'endpoint': 'create_assignment'})
                     raise Exception(error_msg)
 
             except requests.exceptions.RequestException as e:
-                logger.error(f"API request failed: {str(e)}")
+                logger.error("API request failed: %s", e, extra={'endpoint': 'create_assignment'})
                 raise Exception(f"Ошибка соединения с API: {str(e)}")
 
         except Exception as e:
-            logger.error(f"Error in create_assignment: {str(e)}", exc_info=True)
+            logger.error("Error in create_assignment: %s", e, exc_info=True, extra={'endpoint': 'create_assignment'})
             return JsonResponse({'error': str(e)}, status=400)
 
     return JsonResponse({'error': 'Метод не разрешен'}, status=405)
@@ -511,13 +911,17 @@ def create_assignment(request, year, month, day):
 def update_work_status(request, assignment_id):
     if request.method == 'POST':
         try:
-            data = json.loads(request.body)
+            data = jsoncodec.loads(request.body)
             updates = data.get('updates', [])
             response = post_api_data(f"work-assignment-works/update-status/", {"assignment_id": assignment_id, "updates": updates})
-            if response and 'success' in response:
+            if response is None:
+                # 502, а не 400: service worker оставит сохранение в очереди и повторит
+                return JsonResponse({'error': 'API недоступен'}, status=502)
+            if 'success' in response:
+                bump_data_generation()
                 return JsonResponse({'success': True})
             return JsonResponse({'error': 'Не удалось обновить статусы'}, status=400)
         except Exception as e:
-            logger.error(f"Error updating work status: {e}")
+            logger.error("Error updating work status: %s", e, exc_info=True)
             return JsonResponse({'error': str(e)}, status=400)
     return JsonResponse({'error': 'Метод не разрешен'}, status=405)
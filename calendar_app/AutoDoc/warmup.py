@@ -0,0 +1,39 @@
+"""
+Прогрев воркеров gunicorn: URLconf, шаблоны и справочники загружаются заранее,
+а не на первом запросе. С preload_app выполняется один раз в мастере до fork,
+и воркеры получают всё это через copy-on-write.
+"""
+import logging
+import time
+
+from django.template.loader import get_template
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES = [
+    'AutoDoc/calendar.html',
+    'AutoDoc/assignment_details.html',
+    'AutoDoc/assignment_range.html',
+]
+
+
+def warm_up():
+    started = time.monotonic()
+
+    # URLconf и views Django импортирует лениво, на первом запросе
+    get_resolver().url_patterns
+    for name in TEMPLATES:
+        get_template(name)
+
+    from . import views
+    try:
+        # Неполные справочники get_cached_refs сама не запоминает
+        if not all(views.get_cached_refs().values()):
+            logger.warning("Reference data is incomplete, skipping reference cache warm-up")
+    except Exception as e:
+        logger.error("Reference cache warm-up failed: %s", e, exc_info=True)
+
+    elapsed = time.monotonic() - started
+    logger.info("Warm-up finished in %.3fs", elapsed)
+    return elapsed
@@ -123,3 +123,87 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Cache
+# Без REDIS_URL у каждого воркера свой LocMemCache
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+
+# Logging
+# Записи уходят в очередь, форматирование и вывод в JSON - в отдельном потоке.
+# INFO по endpoint можно семплировать, ошибки логируются всегда и полностью.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'payload': {
+            '()': 'AutoDoc.log.PayloadFilter',
+            'rates': {
+                'create_assignment': float(os.environ.get('LOG_SAMPLE_CREATE_ASSIGNMENT', 1.0)),
+                'update_assignment': float(os.environ.get('LOG_SAMPLE_UPDATE_ASSIGNMENT', 1.0)),
+                'post_api_data': float(os.environ.get('LOG_SAMPLE_POST_API_DATA', 1.0)),
+            },
+        },
+    },
+    'formatters': {
+        'json': {
+            '()': 'AutoDoc.log.JsonFormatter',
+        },
+    },
+    'handlers': {
+        'async': {
+            '()': 'AutoDoc.log.AsyncStreamHandler',
+            'formatter': 'json',
+            'filters': ['payload'],
+        },
+    },
+    'root': {
+        'handlers': ['async'],
+        'level': 'WARNING',
+    },
+    'loggers': {
+        'django': {
+            'handlers': ['async'],
+            'level': os.environ.get('DJANGO_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+        'AutoDoc': {
+            'handlers': ['async'],
+            'level': os.environ.get('LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+
+# AutoDoc
+# Кэш общий для всех воркеров. Без него версии страниц (ETag) не берутся из кэша
+# до запроса к API: изменение в одном воркере не сбросило бы их в других
+AUTODOC_SHARED_CACHE = bool(os.environ.get('REDIS_URL'))
+# 'orjson' (если установлен) или 'json' - стандартная библиотека
+AUTODOC_JSON_CODEC = os.environ.get('AUTODOC_JSON_CODEC', 'orjson')
+
+# Сколько секунд хранится версия страницы календаря/дня (ETag) без запроса к API
+AUTODOC_VERSION_TTL = int(os.environ.get('AUTODOC_VERSION_TTL', 30))
+
+# Объединять одинаковые запросы к API между воркерами (нужен общий кэш, REDIS_URL)
+AUTODOC_SHARED_SINGLE_FLIGHT = os.environ.get('AUTODOC_SHARED_SINGLE_FLIGHT', '0') == '1'
+# Сколько секунд ждать чужой запрос к API, прежде чем выполнить свой
+AUTODOC_SINGLE_FLIGHT_TIMEOUT = 10
+# Сколько секунд результат запроса доступен другим воркерам
+AUTODOC_SINGLE_FLIGHT_RESULT_TTL = 2
+# Раз в сколько реальных запросов к API писать в лог счётчики single-flight
+AUTODOC_SINGLE_FLIGHT_LOG_EVERY = 100
@@ -0,0 +1,36 @@
+"""
+Конфигурация gunicorn.
+
+По умолчанию приложение загружается в мастере (preload_app) и прогревается
+до fork. AUTODOC_PRELOAD=0 - каждый воркер загружает и прогревает себя сам.
+"""
+import atexit
+import os
+import time
+
+_started = time.monotonic()
+
+preload_app = os.environ.get('AUTODOC_PRELOAD', '1') == '1'
+
+# Потоки внутри воркера: одновременные одинаковые запросы к API
+# (планшеты в начале смены) объединяются single-flight'ом в get_api_data
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+
+def when_ready(server):
+    if preload_app:
+        from AutoDoc.warmup import warm_up
+        warm_up()
+    server.log.info("Master ready in %.3fs (preload_app=%s)", time.monotonic() - _started, preload_app)
+
+
+def post_worker_init(worker):
+    if not preload_app:
+        from AutoDoc.warmup import warm_up
+        warm_up()
+    worker.log.info("Worker %s ready in %.3fs since master start", worker.pid, time.monotonic() - _started)
+
+    # worker_exit вызывается в мастере, а счётчики single-flight живут в воркере
+    from AutoDoc.views import get_single_flight_stats
+    atexit.register(lambda: worker.log.info("Worker %s API calls: %s", worker.pid, get_single_flight_stats()))